@@ -0,0 +1,152 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+# ----------------- OAUTH (USER LOGIN FOR DRIVE OCR) -----------------
+OAUTH_SCOPES = [
+    "https://www.googleapis.com/auth/drive",
+    "openid",
+    "https://www.googleapis.com/auth/userinfo.email",
+]
+
+CLIENT_ID = st.secrets["google_oauth_client_id"]
+CLIENT_SECRET = st.secrets["google_oauth_client_secret"]
+REDIRECT_URI = st.secrets["redirect_uri"]
+
+
+def build_flow():
+    from google_auth_oauthlib.flow import Flow
+
+    config = {
+        "web": {
+            "client_id": CLIENT_ID,
+            "client_secret": CLIENT_SECRET,
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+            "token_uri": "https://oauth2.googleapis.com/token",
+        }
+    }
+    return Flow.from_client_config(
+        config,
+        scopes=OAUTH_SCOPES,
+        redirect_uri=REDIRECT_URI,
+    )
+
+
+def handle_oauth_callback():
+    params = st.query_params
+    code = params.get("code")
+    if not code:
+        return
+
+    flow = build_flow()
+    flow.fetch_token(code=code)
+
+    creds = flow.credentials
+    st.session_state["oauth_token"] = {
+        "access_token": creds.token,
+        "refresh_token": creds.refresh_token,
+    }
+
+    st.query_params.clear()
+    st.success("Google login successful ✅")
+
+
+# Bounded per-login cache: entries hold the user's refresh token
+@st.cache_resource(ttl=3600, max_entries=32)
+def get_drive_client(access_token, refresh_token):
+    from google.oauth2.credentials import Credentials as UserCredentials
+    from googleapiclient.discovery import build
+
+    creds = UserCredentials(
+        token=access_token,
+        refresh_token=refresh_token,
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=CLIENT_ID,
+        client_secret=CLIENT_SECRET,
+        scopes=OAUTH_SCOPES,
+    )
+    # Use the discovery doc bundled with googleapiclient; no fetch from googleapis.com
+    drive = build(
+        "drive",
+        "v3",
+        credentials=creds,
+        static_discovery=True,
+        cache_discovery=False,
+    )
+    return creds, drive
+
+
+def get_drive_service():
+    token = st.session_state.get("oauth_token")
+    if not token:
+        return None, None
+    return get_drive_client(token["access_token"], token.get("refresh_token"))
+
+
+def logout():
+    token = st.session_state.pop("oauth_token", None)
+    if token:
+        get_drive_client.clear(token["access_token"], token.get("refresh_token"))
+
+
+@st.cache_resource
+def cleanup_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="drive-cleanup")
+
+
+# ----------------- OCR -----------------
+# Memos above this size are streamed in chunks with a progress bar
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def drive_ocr_pdf_to_text(drive, creds, pdf_bytes: bytes, filename: str) -> str:
+    from googleapiclient.http import MediaInMemoryUpload
+    from google_auth_httplib2 import AuthorizedHttp
+
+    doc_file_id = None
+
+    try:
+        resumable = len(pdf_bytes) > RESUMABLE_THRESHOLD
+        media = MediaInMemoryUpload(
+            pdf_bytes,
+            mimetype="application/pdf",
+            chunksize=UPLOAD_CHUNK_SIZE,
+            resumable=resumable,
+        )
+
+        # Uploading straight to a Google Doc makes Drive OCR the PDF in one call
+        request = drive.files().create(
+            body={
+                "name": f"OCR_{filename}_{uuid.uuid4().hex[:8]}",
+                "mimeType": "application/vnd.google-apps.document",
+            },
+            media_body=media,
+            fields="id",
+        )
+
+        if resumable:
+            progress = st.progress(0.0, text="Uploading memo…")
+            doc_created = None
+            while doc_created is None:
+                status, doc_created = request.next_chunk()
+                if status:
+                    progress.progress(status.progress(), text="Uploading memo…")
+            progress.empty()
+        else:
+            doc_created = request.execute()
+        doc_file_id = doc_created["id"]
+
+        exported = drive.files().export(
+            fileId=doc_file_id,
+            mimeType="text/plain",
+        ).execute()
+
+        return exported.decode("utf-8", errors="ignore")
+
+    finally:
+        if doc_file_id:
+            # httplib2 is not thread-safe, so the worker gets its own connection
+            delete = drive.files().delete(fileId=doc_file_id)
+            cleanup_executor().submit(delete.execute, http=AuthorizedHttp(creds))
@@ -0,0 +1,58 @@
+import io
+import re
+
+# ----------------- REGEX -----------------
+MEMO_RE = re.compile(r"\bMemo\s*#\s*[:\-]?\s*([A-Z0-9\-]+)\b", re.I)
+ITEM_RE = re.compile(r"\b(?:BR|BS|GB)[2-8][YW]-14K(?:-[1-4])?\b", re.I)
+# Standalone whole number: not code digits (the -1 in BR2Y-14K-1), not part of
+# a decimal or thousands-separated figure (2.5, 1,200), not a price ($350)
+QTY_RE = re.compile(r"(?<![-\w.,$€£])(\d+)\b(?![.,]\d)")
+
+
+# ----------------- PARSE -----------------
+def parse_items(text: str):
+    memo_no = None
+    m = MEMO_RE.search(text)
+    if m:
+        memo_no = m.group(1)
+
+    # (code, qty) pairs; duplicates are summed when the preview is built
+    items = []
+    for ln in text.splitlines():
+        code = ITEM_RE.search(ln)
+        if not code:
+            continue
+
+        u = ln.upper()
+        if "SHIPPING" in u or "INSURANCE" in u:
+            continue
+
+        # First number after the code, else the first one before it
+        qty = QTY_RE.search(ln, code.end()) or QTY_RE.search(ln, 0, code.start())
+        if not qty:
+            continue
+
+        q = int(qty.group(1))
+        if 1 <= q <= 999:
+            items.append((code.group(0).upper(), q))
+
+    return memo_no, items
+
+
+def peek_memo_no(pdf_bytes: bytes):
+    """Memo # from the PDF's own text layer, without OCR.
+
+    Returns None for scanned PDFs with no text layer, or if pypdf is missing.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+
+    try:
+        first_text = PdfReader(io.BytesIO(pdf_bytes)).pages[0].extract_text() or ""
+    except Exception:
+        return None
+
+    m = MEMO_RE.search(first_text)
+    return m.group(1) if m else None
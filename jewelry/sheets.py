@@ -0,0 +1,185 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import streamlit as st
+
+# ----------------- SHEETS (SERVICE ACCOUNT) -----------------
+SHEETS_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+
+@st.cache_resource
+def get_clients():
+    import gspread
+    from google.oauth2.service_account import Credentials as SACredentials
+
+    # Auth + spreadsheet/worksheet lookups are paid once per process, not per rerun
+    sa_creds = SACredentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=SHEETS_SCOPES,
+    )
+    gc = gspread.authorize(sa_creds)
+    sh = gc.open_by_url(st.secrets["sheet_url"])
+    return gc, sh, sh.worksheet("INVENTORY"), sh.worksheet("TRANSACTIONS_LOG")
+
+
+# Day 0 of Google Sheets' date serial numbers
+SHEETS_EPOCH = datetime(1899, 12, 30)
+
+
+def now_local():
+    return datetime.now(timezone.utc).astimezone().replace(tzinfo=None, microsecond=0)
+
+
+# ----------------- INVENTORY -----------------
+def memo_col_letter():
+    # Column letter of memo_no in TRANSACTIONS_LOG, looked up once per session
+    if "memo_col_letter" not in st.session_state:
+        from gspread.utils import rowcol_to_a1
+
+        _, _, _, ws_log = get_clients()
+        col = ws_log.row_values(1).index("memo_no") + 1
+        st.session_state["memo_col_letter"] = rowcol_to_a1(1, col)[:-1]
+    return st.session_state["memo_col_letter"]
+
+
+def fetch_memos(ws_log, col):
+    # Range-limited read of just the memo_no cells below the header
+    values = ws_log.get(f"{col}2:{col}", major_dimension="COLUMNS")
+    return {str(v).strip().upper() for v in (values[0] if values else [])}
+
+
+def memo_exists(memo_no):
+    # Always a fresh read – this is the last check before writing
+    _, _, _, ws_log = get_clients()
+    return str(memo_no).strip().upper() in fetch_memos(ws_log, memo_col_letter())
+
+
+@st.cache_resource
+def prefetch_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="sheets-prefetch")
+
+
+def prefetch_memos():
+    """Start reading the memo_no column on a worker thread.
+
+    Returns a future of the known-memo set, or None when the column can't be
+    resolved. Clients and session state are resolved here, on the script
+    thread; the worker only makes the gspread call.
+    """
+    try:
+        _, _, _, ws_log = get_clients()
+        col = memo_col_letter()
+    except Exception:
+        return None
+    return prefetch_executor().submit(fetch_memos, ws_log, col)
+
+
+def is_known_memo(memo_no, memos_future):
+    """Best-effort duplicate hint from prefetch_memos; False if the lookup failed."""
+    if memos_future is None:
+        return False
+    try:
+        return str(memo_no).strip().upper() in memos_future.result()
+    except Exception:
+        return False
+
+
+def coalesce_row_runs(row_values):
+    """Group sorted (row, value) pairs into (start_row, values) runs of consecutive rows."""
+    runs = []
+    prev = None
+    for row, value in row_values:
+        if prev is None or row != prev + 1:
+            runs.append((row, []))
+        runs[-1][1].append(value)
+        prev = row
+    return runs
+
+
+def cell_data(value):
+    if isinstance(value, datetime):
+        # Serial number + DATE_TIME format, as USER_ENTERED input would store it
+        return {
+            "userEnteredValue": {
+                "numberValue": (value - SHEETS_EPOCH).total_seconds() / 86400
+            },
+            "userEnteredFormat": {
+                "numberFormat": {"type": "DATE_TIME", "pattern": "yyyy-mm-dd hh:mm:ss"}
+            },
+        }
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+def apply_updates(df_preview, memo_no, reason, employee):
+    _, sh, ws_inventory, ws_log = get_clients()
+
+    # Row numbers and stock levels come from one fresh read – never a cache –
+    # so a sort or concurrent edit can't redirect or overwrite a write
+    inv_all = ws_inventory.get_all_values()
+    header = inv_all[0]
+    code_col = header.index("item_code")
+    qty_col = header.index("on_hand")
+
+    code_to_row = {}
+    on_hand = {}
+    for i, row in enumerate(inv_all[1:]):
+        code = row[code_col].strip().upper()
+        code_to_row[code] = i + 2
+        try:
+            on_hand[code] = int(row[qty_col] or 0)
+        except ValueError:
+            on_hand[code] = 0
+
+    updates = []
+    for _, r in df_preview.iterrows():
+        code = str(r["item_code"]).strip().upper()
+        qty = int(r["qty"])
+        if code not in code_to_row:
+            raise ValueError(f"Unknown item code: {code}")
+        new = on_hand[code] - qty
+        if new < 0:
+            raise ValueError(f"Negative stock: {code}")
+        updates.append((code, new, -qty))
+
+    runs = coalesce_row_runs(
+        sorted((code_to_row[code], new_qty) for code, new_qty, _ in updates)
+    )
+
+    ts = now_local()
+    logs = []
+    for code, _, chg in updates:
+        logs.append([ts, "Memo PDF", memo_no or "", code, chg, reason, employee, ""])
+
+    # Inventory writes and the log append go out as one spreadsheet batchUpdate
+    requests = [
+        {
+            "updateCells": {
+                "range": {
+                    "sheetId": ws_inventory.id,
+                    "startRowIndex": start - 1,
+                    "endRowIndex": start - 1 + len(values),
+                    "startColumnIndex": qty_col,
+                    "endColumnIndex": qty_col + 1,
+                },
+                "rows": [{"values": [cell_data(v)]} for v in values],
+                "fields": "userEnteredValue",
+            }
+        }
+        for start, values in runs
+    ]
+    requests.append(
+        {
+            "appendCells": {
+                "sheetId": ws_log.id,
+                "rows": [{"values": [cell_data(v) for v in log]} for log in logs],
+                "fields": "userEnteredValue,userEnteredFormat.numberFormat",
+            }
+        }
+    )
+
+    sh.batch_update({"requests": requests})
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from jewelry.parse import parse_items
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("BR2Y-14K 3 pcs", [("BR2Y-14K", 3)]),
+        ("BR2Y-14K-1 Ring 3", [("BR2Y-14K-1", 3)]),
+        ("Ring BS4W-14K-4 qty: 7", [("BS4W-14K-4", 7)]),
+        # qty before the code is used when none follows it
+        ("2 BR2Y-14K Ring", [("BR2Y-14K", 2)]),
+        ("2 BR2Y-14K-1 Ring", [("BR2Y-14K-1", 2)]),
+        # the -1 suffix is part of the code, never the quantity
+        ("BR2Y-14K-1 Ring", []),
+        ("BR2Y-14K", []),
+        ("BR2Y-14K 1000", []),
+        # weights and prices are never the quantity
+        ("1 BR2Y-14K Ring 14K gold 2.5 gr $350", [("BR2Y-14K", 1)]),
+        ("BR2Y-14K 1,200.00 2", [("BR2Y-14K", 2)]),
+        ("GB5W-14K-2 Shipping 1", []),
+        ("GB5W-14K-2 insurance 1", []),
+    ],
+)
+def test_parse_item_line(line, expected):
+    assert parse_items(line)[1] == expected
+
+
+def test_parse_items_multiline():
+    text = "Memo # : A-123\r\nbr2y-14k 2\r\n2 GB5W-14K-2\nBR2Y-14K-1 Ring\nBR2Y-14K 3\n"
+    memo_no, items = parse_items(text)
+    assert memo_no == "A-123"
+    assert items == [("BR2Y-14K", 2), ("GB5W-14K-2", 2), ("BR2Y-14K", 3)]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        # ~46 KB single line of numbers and no item code
+        " ".join(str(i) for i in range(9000)),
+        " ".join(str(i) for i in range(9000)) + " BR2Y-14K",
+        "\n".join(f"{i} BR{2 + i % 7}Y-14K-{1 + i % 4} Ring {i % 9 + 1}" for i in range(2000)),
+    ],
+)
+def test_parse_items_is_linear(text):
+    start = time.perf_counter()
+    parse_items(text)
+    assert time.perf_counter() - start < 0.5
@@ -0,0 +1,130 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from jewelry import sheets
+from jewelry.sheets import cell_data, coalesce_row_runs
+
+
+def test_coalesce_row_runs():
+    assert coalesce_row_runs([(2, 5), (3, 6), (5, 1), (9, 0), (10, 3)]) == [
+        (2, [5, 6]),
+        (5, [1]),
+        (9, [0, 3]),
+    ]
+    assert coalesce_row_runs([(4, 1)]) == [(4, [1])]
+    assert coalesce_row_runs([]) == []
+    # a repeated row starts a new run rather than extending into row + 1
+    assert coalesce_row_runs([(2, 5), (2, 4), (3, 1)]) == [(2, [5]), (2, [4, 1])]
+
+
+def test_cell_data():
+    assert cell_data(3) == {"userEnteredValue": {"numberValue": 3}}
+    assert cell_data("Sale") == {"userEnteredValue": {"stringValue": "Sale"}}
+    assert cell_data(datetime(2024, 1, 1)) == {
+        "userEnteredValue": {"numberValue": 45292},
+        "userEnteredFormat": {
+            "numberFormat": {"type": "DATE_TIME", "pattern": "yyyy-mm-dd hh:mm:ss"}
+        },
+    }
+    assert cell_data(datetime(2024, 1, 1, 12))["userEnteredValue"] == {"numberValue": 45292.5}
+
+
+class FakeWorksheet:
+    def __init__(self, sheet_id, values=None):
+        self.id = sheet_id
+        self.values = values
+
+    def get_all_values(self):
+        return self.values
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.bodies = []
+
+    def batch_update(self, body):
+        self.bodies.append(body)
+
+
+@pytest.fixture
+def fake_clients(monkeypatch):
+    ws_inventory = FakeWorksheet(
+        11,
+        [
+            ["name", "item_code", "on_hand"],
+            ["Ring", "BR2Y-14K", "5"],
+            ["Set", "bs3w-14k ", "10"],
+            ["Bangle", "GB4Y-14K", "7"],
+            ["Ring", "BR5W-14K-1", ""],
+        ],
+    )
+    ws_log = FakeWorksheet(22)
+    sh = FakeSpreadsheet()
+    monkeypatch.setattr(sheets, "get_clients", lambda: (None, sh, ws_inventory, ws_log))
+    return sh
+
+
+def preview(*rows):
+    return pd.DataFrame(rows, columns=["item_code", "qty"])
+
+
+def test_apply_updates_requests(fake_clients):
+    sheets.apply_updates(
+        preview(("BR2Y-14K", 2), ("BS3W-14K", 1), ("GB4Y-14K", 7)), "M-1", "Sale", "Ana"
+    )
+
+    (body,) = fake_clients.bodies
+    *updates, append = body["requests"]
+
+    # rows 2-4 are one run; on_hand is the third column (index 2)
+    assert updates == [
+        {
+            "updateCells": {
+                "range": {
+                    "sheetId": 11,
+                    "startRowIndex": 1,
+                    "endRowIndex": 4,
+                    "startColumnIndex": 2,
+                    "endColumnIndex": 3,
+                },
+                "rows": [
+                    {"values": [{"userEnteredValue": {"numberValue": 3}}]},
+                    {"values": [{"userEnteredValue": {"numberValue": 9}}]},
+                    {"values": [{"userEnteredValue": {"numberValue": 0}}]},
+                ],
+                "fields": "userEnteredValue",
+            }
+        }
+    ]
+
+    log = append["appendCells"]
+    assert log["sheetId"] == 22
+    assert log["fields"] == "userEnteredValue,userEnteredFormat.numberFormat"
+    assert len(log["rows"]) == 3
+    ts, *rest = log["rows"][0]["values"]
+    assert ts["userEnteredFormat"]["numberFormat"]["type"] == "DATE_TIME"
+    assert rest == [
+        cell_data(v) for v in ["Memo PDF", "M-1", "BR2Y-14K", -2, "Sale", "Ana", ""]
+    ]
+
+
+def test_apply_updates_splits_non_consecutive_rows(fake_clients):
+    sheets.apply_updates(preview(("GB4Y-14K", 1), ("BR2Y-14K", 1)), None, "Sale", "Ana")
+
+    ranges = [r["updateCells"]["range"] for r in fake_clients.bodies[0]["requests"][:-1]]
+    assert [(r["startRowIndex"], r["endRowIndex"]) for r in ranges] == [(1, 2), (3, 4)]
+
+
+@pytest.mark.parametrize(
+    "rows, message",
+    [
+        ((("BR5W-14K-1", 1),), "Negative stock: BR5W-14K-1"),
+        ((("BR8Y-14K", 1),), "Unknown item code: BR8Y-14K"),
+    ],
+)
+def test_apply_updates_rejects_without_writing(fake_clients, rows, message):
+    with pytest.raises(ValueError, match=message):
+        sheets.apply_updates(preview(*rows), "M-1", "Sale", "Ana")
+    assert fake_clients.bodies == []